@@ -3,10 +3,13 @@ Chat Logic Module
 Orchestrates RAG retrieval and LLM generation with role-aware constraints
 """
 
+import asyncio
+import re
+from functools import lru_cache
 from typing import Optional
 from rag import retrieve_texts
-from llm import generate_answer
-from fallback_qa import get_fallback_response
+from llm import generate_answer, generate_answer_async
+from fallback_qa import get_fallback_response, record_llm_answer
 
 
 # Role-specific permission constraints
@@ -50,6 +53,22 @@ DO NOT suggest accessing individual household data or making operational decisio
 }
 
 
+# Phrases signalling the LLM punted; compiled once so checking a response
+# is a single scan instead of one substring pass per phrase
+_UNHELPFUL_PHRASES = [
+    "i don't have sufficient information",
+    "i don't have enough information",
+    "please consult your administrator",
+    "i cannot answer",
+    "insufficient information",
+    "i'm not able to"
+]
+_UNHELPFUL_RE = re.compile(
+    '|'.join(re.escape(phrase) for phrase in _UNHELPFUL_PHRASES),
+    re.IGNORECASE
+)
+
+
 # Page-specific context
 PAGE_CONTEXT = {
     "dashboard": "The user is on the Dashboard page showing their personalized overview.",
@@ -64,15 +83,23 @@ PAGE_CONTEXT = {
 def build_system_prompt(role: str, page: Optional[str] = None) -> str:
     """
     Build role-aware system prompt with constraints.
-    
+
     Args:
         role: User's role (supervisor, district_admin, state_analyst, policy_maker)
         page: Current page context (optional)
-    
+
     Returns:
         System prompt string
     """
-    
+    # Normalize before the cached call so case variants share one entry
+    return _build_system_prompt_cached(role.lower(), page.lower() if page else None)
+
+
+@lru_cache(maxsize=64)
+def _build_system_prompt_cached(role: str, page: Optional[str]) -> str:
+    """Assemble the prompt for pre-normalized (role, page). The domain is
+    tiny (~25 combinations) so every request after warm-up is a cache hit."""
+
     base_prompt = """You are an AI Governance Assistant for a government census management platform.
 
 Your purpose is to:
@@ -92,17 +119,129 @@ CRITICAL RULES:
 """
     
     # Add role constraints
-    role_constraint = ROLE_CONSTRAINTS.get(role.lower(), "")
+    role_constraint = ROLE_CONSTRAINTS.get(role, "")
     if role_constraint:
         base_prompt += f"\n{role_constraint}"
-    
+
     # Add page context
-    if page and page.lower() in PAGE_CONTEXT:
-        base_prompt += f"\n\nCONTEXT: {PAGE_CONTEXT[page.lower()]}"
-    
+    if page and page in PAGE_CONTEXT:
+        base_prompt += f"\n\nCONTEXT: {PAGE_CONTEXT[page]}"
+
     return base_prompt
 
 
+_VALID_ROLES = ("supervisor", "district_admin", "state_analyst", "policy_maker")
+
+
+def _validate_request(user_message: str, user_role: str) -> Optional[dict]:
+    """Return an early-exit payload for blank messages or unknown roles."""
+    if not user_message or not user_message.strip():
+        return {
+            "response": "Please ask a question about the census platform.",
+            "sources_used": 0,
+            "error": None
+        }
+    if user_role.lower() not in _VALID_ROLES:
+        return {
+            "response": "Invalid user role. Please contact system administrator.",
+            "sources_used": 0,
+            "error": "invalid_role"
+        }
+    return None
+
+
+def _no_context_response(user_message: str, user_role: str, page: Optional[str]) -> dict:
+    """Build the payload used when retrieval finds nothing relevant."""
+    print(f"[DEBUG] No RAG results, trying fallback...")
+    fallback_response = get_fallback_response(user_message, user_role, page)
+    if fallback_response and "I don't have" not in fallback_response:
+        print(f"[DEBUG] Using fallback response")
+        return {
+            "response": fallback_response,
+            "sources_used": 0,
+            "error": None
+        }
+    # If no fallback either, return generic message
+    print(f"[DEBUG] No fallback match, using generic")
+    return {
+        "response": "I don't have enough information to answer that question. Please contact your administrator or refer to the platform documentation.",
+        "sources_used": 0,
+        "error": None
+    }
+
+
+def _build_full_prompt(user_message: str, user_role: str, page: Optional[str],
+                       retrieved_docs: list) -> str:
+    """Compose the system prompt, retrieved context, and user question."""
+    context_sections = []
+    for i, doc in enumerate(retrieved_docs, 1):
+        context_sections.append(f"[Source {i}]: {doc['text']}")
+
+    retrieved_context = "\n\n".join(context_sections)
+    system_prompt = build_system_prompt(user_role, page)
+
+    return f"""{system_prompt}
+
+---
+RETRIEVED KNOWLEDGE:
+{retrieved_context}
+---
+
+USER QUESTION: {user_message}
+
+YOUR RESPONSE (Provide a complete, professional explanation in 2-5 sentences. Base your answer ONLY on the retrieved knowledge above. Always complete your sentences fully):"""
+
+
+def _polish_response(response_text: str, user_message: str, user_role: str,
+                     page: Optional[str]) -> str:
+    """Swap unhelpful LLM output for a fallback and patch abrupt endings."""
+    print(f"[DEBUG] LLM response: {response_text[:100]}...")
+
+    # Check if LLM gave an unhelpful/generic response
+    from_llm = True
+    if _UNHELPFUL_RE.search(response_text) is not None:
+        print(f"[DEBUG] LLM gave unhelpful response, trying fallback...")
+        fallback_response = get_fallback_response(user_message, user_role, page)
+        if fallback_response and not _UNHELPFUL_RE.search(fallback_response):
+            print(f"[DEBUG] Using fallback instead of unhelpful LLM response")
+            response_text = fallback_response
+            from_llm = False
+
+    # Check if response seems incomplete (ends abruptly without punctuation)
+    if response_text and not response_text[-1] in '.!?':
+        response_text += "..."
+
+    # Feed genuine live answers back into fallback_qa's semantic cache so
+    # paraphrases of this question can be answered even when Gemini is down
+    if from_llm:
+        try:
+            record_llm_answer(user_message, response_text, user_role, page)
+        except Exception:
+            pass  # cache write is best-effort
+
+    return response_text
+
+
+def _error_response(user_message: str, user_role: str, page: Optional[str],
+                    e: Exception) -> dict:
+    """Last-resort payload: try the fallback corpus, then a generic apology."""
+    print(f"Error in generate_chatbot_response: {e}")
+    # Use fallback even for critical errors
+    try:
+        fallback_response = get_fallback_response(user_message, user_role, page)
+        return {
+            "response": fallback_response,
+            "sources_used": 0,
+            "error": None
+        }
+    except:
+        return {
+            "response": "I encountered an error processing your request. Please try again.",
+            "sources_used": 0,
+            "error": str(e)
+        }
+
+
 def generate_chatbot_response(
     user_message: str,
     user_role: str,
@@ -119,23 +258,11 @@ def generate_chatbot_response(
     Returns:
         Dictionary with response and metadata
     """
-    
-    # Validate inputs
-    if not user_message or not user_message.strip():
-        return {
-            "response": "Please ask a question about the census platform.",
-            "sources_used": 0,
-            "error": None
-        }
-    
-    valid_roles = ["supervisor", "district_admin", "state_analyst", "policy_maker"]
-    if user_role.lower() not in valid_roles:
-        return {
-            "response": "Invalid user role. Please contact system administrator.",
-            "sources_used": 0,
-            "error": "invalid_role"
-        }
-    
+
+    early_exit = _validate_request(user_message, user_role)
+    if early_exit is not None:
+        return early_exit
+
     try:
         # Step 1: Retrieve relevant knowledge via RAG
         retrieved_docs = retrieve_texts(
@@ -148,81 +275,21 @@ def generate_chatbot_response(
         print(f"[DEBUG] RAG returned {len(retrieved_docs) if retrieved_docs else 0} documents")
         
         if not retrieved_docs:
-            # No relevant docs found - try fallback first
-            print(f"[DEBUG] No RAG results, trying fallback...")
-            fallback_response = get_fallback_response(user_message, user_role, page)
-            if fallback_response and "I don't have" not in fallback_response:
-                print(f"[DEBUG] Using fallback response")
-                return {
-                    "response": fallback_response,
-                    "sources_used": 0,
-                    "error": None
-                }
-            # If no fallback either, return generic message
-            print(f"[DEBUG] No fallback match, using generic")
-            return {
-                "response": "I don't have enough information to answer that question. Please contact your administrator or refer to the platform documentation.",
-                "sources_used": 0,
-                "error": None
-            }
-        
-        # Step 2: Build context from retrieved documents
-        context_sections = []
-        for i, doc in enumerate(retrieved_docs, 1):
-            context_sections.append(f"[Source {i}]: {doc['text']}")
-        
-        retrieved_context = "\n\n".join(context_sections)
-        
-        # Step 3: Build full prompt
-        system_prompt = build_system_prompt(user_role, page)
-        
-        full_prompt = f"""{system_prompt}
+            return _no_context_response(user_message, user_role, page)
 
----
-RETRIEVED KNOWLEDGE:
-{retrieved_context}
----
+        # Step 2: Build full prompt from retrieved documents
+        full_prompt = _build_full_prompt(user_message, user_role, page, retrieved_docs)
 
-USER QUESTION: {user_message}
-
-YOUR RESPONSE (Provide a complete, professional explanation in 2-5 sentences. Base your answer ONLY on the retrieved knowledge above. Always complete your sentences fully):"""
-        
-        # Step 4: Generate response using LLM (increased tokens for complete answers)
+        # Step 3: Generate response using LLM (increased tokens for complete answers)
         try:
             response_text = generate_answer(full_prompt, max_tokens=800)
-            
-            print(f"[DEBUG] LLM response: {response_text[:100]}...")
-            
-            # Check if LLM gave an unhelpful/generic response
-            unhelpful_phrases = [
-                "i don't have sufficient information",
-                "i don't have enough information",
-                "please consult your administrator",
-                "i cannot answer",
-                "insufficient information",
-                "i'm not able to"
-            ]
-            
-            response_lower = response_text.lower()
-            is_unhelpful = any(phrase in response_lower for phrase in unhelpful_phrases)
-            
-            if is_unhelpful:
-                print(f"[DEBUG] LLM gave unhelpful response, trying fallback...")
-                fallback_response = get_fallback_response(user_message, user_role, page)
-                if fallback_response and not any(phrase in fallback_response.lower() for phrase in unhelpful_phrases):
-                    print(f"[DEBUG] Using fallback instead of unhelpful LLM response")
-                    response_text = fallback_response
-            
-            # Check if response seems incomplete (ends abruptly without punctuation)
-            if response_text and not response_text[-1] in '.!?':
-                response_text += "..."
-                
+            response_text = _polish_response(response_text, user_message, user_role, page)
         except Exception as llm_error:
             # Fallback to pre-generated responses if LLM fails
             print(f"[DEBUG] LLM generation failed, using fallback: {llm_error}")
             response_text = get_fallback_response(user_message, user_role, page)
         
-        # Step 5: Return structured response
+        # Step 4: Return structured response
         return {
             "response": response_text,
             "sources_used": len(retrieved_docs),
@@ -230,21 +297,71 @@ YOUR RESPONSE (Provide a complete, professional explanation in 2-5 sentences. Ba
         }
     
     except Exception as e:
-        print(f"Error in generate_chatbot_response: {e}")
-        # Use fallback even for critical errors
+        return _error_response(user_message, user_role, page, e)
+
+
+async def generate_chatbot_response_async(
+    user_message: str,
+    user_role: str,
+    page: Optional[str] = None
+) -> dict:
+    """
+    Async counterpart of generate_chatbot_response for use on the event loop.
+
+    Retrieval (a MiniLM forward pass plus an HNSW search) is CPU-bound, so
+    it still runs in a worker thread; the Gemini call awaits the SDK's
+    async client over its persistent channel, so the request holds no
+    thread while waiting on the network.
+
+    Args:
+        user_message: User's question or message
+        user_role: User's role in the system
+        page: Current page user is on (optional)
+
+    Returns:
+        Dictionary with response and metadata
+    """
+
+    early_exit = _validate_request(user_message, user_role)
+    if early_exit is not None:
+        return early_exit
+
+    try:
+        retrieved_docs = await asyncio.to_thread(
+            retrieve_texts,
+            query=user_message,
+            n_results=5,
+            role=user_role.lower(),
+            page=page.lower() if page else None
+        )
+
+        print(f"[DEBUG] RAG returned {len(retrieved_docs) if retrieved_docs else 0} documents")
+
+        if not retrieved_docs:
+            return _no_context_response(user_message, user_role, page)
+
+        full_prompt = _build_full_prompt(user_message, user_role, page, retrieved_docs)
+
         try:
-            fallback_response = get_fallback_response(user_message, user_role, page)
-            return {
-                "response": fallback_response,
-                "sources_used": 0,
-                "error": None
-            }
-        except:
-            return {
-                "response": "I encountered an error processing your request. Please try again.",
-                "sources_used": 0,
-                "error": str(e)
-            }
+            response_text = await generate_answer_async(full_prompt, max_tokens=800)
+            # Polishing may run the fallback matcher and a semantic-cache
+            # encode - CPU-bound, so keep it in a worker thread
+            response_text = await asyncio.to_thread(
+                _polish_response, response_text, user_message, user_role, page
+            )
+        except Exception as llm_error:
+            # Fallback to pre-generated responses if LLM fails
+            print(f"[DEBUG] LLM generation failed, using fallback: {llm_error}")
+            response_text = get_fallback_response(user_message, user_role, page)
+
+        return {
+            "response": response_text,
+            "sources_used": len(retrieved_docs),
+            "error": None
+        }
+
+    except Exception as e:
+        return _error_response(user_message, user_role, page, e)
 
 
 def get_quick_help(role: str, page: Optional[str] = None) -> str:
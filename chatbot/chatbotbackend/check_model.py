@@ -1,52 +1,66 @@
 """
 Check available Gemini models for your API key
 Run this to see which models you can use
+
+The model list rarely changes, so results come from the shared
+model_cache module (~/.cache/hackingdelhi/models.json) and are reused
+until the TTL expires. Pass --refresh to force a fresh API call, or set
+MODEL_CACHE_TTL (seconds) to tune how long cached results are trusted.
 """
 
 import google.generativeai as genai
 import os
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 
+from model_cache import get_available_models
+
 # Load .env from backend folder
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-api_key = os.getenv("GEMINI_API_KEY")
 
-if not api_key:
-    print("❌ Error: GEMINI_API_KEY not found in .env file")
-    exit(1)
+def main():
+    api_key = os.getenv("GEMINI_API_KEY")
 
-genai.configure(api_key=api_key)
+    if not api_key:
+        print("❌ Error: GEMINI_API_KEY not found in .env file")
+        exit(1)
 
-print(f"Checking models for API Key starting with: {api_key[:10]}...")
-print("=" * 60)
+    genai.configure(api_key=api_key)
 
-try:
-    models_found = []
-    for m in genai.list_models():
-        if 'generateContent' in m.supported_generation_methods:
-            models_found.append(m.name)
-            print(f"✓ {m.name}")
-    
-    print("=" * 60)
-    print(f"\nTotal models available: {len(models_found)}")
-    
-    if models_found:
-        print("\n💡 Recommended models to try:")
-        recommended = [m for m in models_found if 'flash' in m.lower() or 'pro' in m.lower()]
-        for model in recommended[:3]:
-            print(f"   - {model}")
-    else:
-        print("\n⚠️  No models found. Your API key might have issues.")
-        print("   Try creating a new API key at: https://aistudio.google.com/app/apikey")
-        
-except Exception as e:
+    refresh = "--refresh" in sys.argv
+
+    print(f"Checking models for API Key starting with: {api_key[:10]}...")
     print("=" * 60)
-    print(f"❌ Error: {e}")
-    print("\n💡 Troubleshooting:")
-    print("   1. Check your API key is valid")
-    print("   2. Ensure you haven't exceeded quota")
-    print("   3. Try creating a new API key")
-    print("   4. Visit: https://aistudio.google.com/app/apikey")
+
+    try:
+        models_found = get_available_models(refresh=refresh)
+        for model in models_found:
+            print(f"✓ {model}")
+
+        print("=" * 60)
+        print(f"\nTotal models available: {len(models_found)}")
+
+        if models_found:
+            print("\n💡 Recommended models to try:")
+            recommended = [m for m in models_found if 'flash' in m.lower() or 'pro' in m.lower()]
+            for model in recommended[:3]:
+                print(f"   - {model}")
+        else:
+            print("\n⚠️  No models found. Your API key might have issues.")
+            print("   Try creating a new API key at: https://aistudio.google.com/app/apikey")
+
+    except Exception as e:
+        print("=" * 60)
+        print(f"❌ Error: {e}")
+        print("\n💡 Troubleshooting:")
+        print("   1. Check your API key is valid")
+        print("   2. Ensure you haven't exceeded quota")
+        print("   3. Try creating a new API key")
+        print("   4. Visit: https://aistudio.google.com/app/apikey")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,209 +3,426 @@ Fallback Q&A Database for Demo Purposes
 Used when Gemini API is unavailable or rate-limited
 """
 
-# Comprehensive Q&A database organized by role and page context
-FALLBACK_QA = {
-    # SUPERVISOR QUESTIONS
-    "supervisor": {
-        "dashboard": {
-            "what can i do on this dashboard": "As a Supervisor, your Dashboard provides a personalized overview of your work. You can see pending reviews that need your attention, recent household submissions from your team, approval/rejection statistics, and quick access to flagged records requiring manual verification. The dashboard also shows your district's current census progress and any urgent tasks.",
-            
-            "what are my pending tasks": "Your pending tasks include households flagged for manual review, recent submissions waiting for approval or rejection, incomplete household records that need follow-up, and any quality checks identified by the AI verification system. You can access these directly from the Review Queue section.",
-            
-            "explain my recent activity": "Your recent activity shows a timeline of actions you've performed including households created, records approved or rejected, status changes made, and notes added to flagged submissions. This audit trail helps you track your work and provides accountability for all census data modifications.",
-            
-            "how do i create a household": "To create a household record, navigate to the main dashboard and click 'Create New Household'. You'll need to provide mandatory information including family head name, complete address, family size, total income, and at least one identity proof document. The system will validate your inputs and flag any inconsistencies for review."
-        },
-        
-        "review": {
-            "why are records flagged for review": "Records are flagged by our AI verification system when it detects potential inconsistencies or suspicious patterns. Common reasons include: income exceeding typical thresholds for the declared occupation, missing or invalid identity documents, duplicate addresses within the district, unusual family compositions, or inconsistent age declarations among family members.",
-            
-            "what is the review workflow": "The review workflow has five steps: First, AI flags suspicious records with specific reasons. Second, the record enters your Review Queue with priority levels. Third, you investigate by examining the household data and supporting documents. Fourth, you either approve the record if legitimate or reject it with a detailed justification. Finally, your decision is logged in the audit trail for accountability and reporting.",
-            
-            "how should i handle inconsistent data": "When you encounter inconsistent data, first review the specific flag reason provided by the AI system. Check all supporting documents carefully. If the inconsistency appears legitimate (like a retired doctor with low income), add detailed notes explaining your reasoning and approve the record. If the data seems fraudulent or incorrect, reject the submission and request the field agent to re-verify with the household.",
-            
-            "what happens after i approve a record": "After you approve a record, it moves from pending status to verified in the system. The household data becomes part of the official census count for your district. The approval action is logged in the audit trail with your user ID, timestamp, and any notes you added. District Admins and State Analysts can then include this data in their analytics and reports."
-        },
-        
-        "analytics": {
-            "what metrics can i see": "As a Supervisor, you can view district-level metrics including total households under your supervision, verification success rates, pending reviews count, average household income in your area, demographic breakdowns by age and occupation, and your personal approval/rejection statistics. These metrics update in real-time as you process submissions.",
-            
-            "how is average income calculated": "Average household income is calculated by summing all reported household incomes in your district and dividing by the number of verified households. Only approved records are included in this calculation. The system automatically excludes outliers and rejected submissions to ensure data accuracy.",
-            
-            "can i see other districts data": "No, as a Supervisor your analytics access is restricted to your assigned district only. This ensures data privacy and prevents unauthorized access to sensitive census information from other regions. Only District Admins and State Analysts have cross-district visibility."
-        },
-        
-        "audit": {
-            "what actions are tracked": "The audit system tracks all critical actions including household creation with user ID, record updates showing what changed, approval and rejection decisions with justifications, status changes from pending to verified, user login and logout times, and any manual data corrections. Each entry includes timestamp, user identity, and affected household ID.",
-            
-            "how can i view my audit history": "Navigate to the Audit Logs page where you can filter by your username to see all actions you've performed. You can also filter by date range, action type (created, updated, approved, rejected), or specific household IDs. Export functionality allows you to download your audit history for personal records."
-        }
-    },
-    
-    # DISTRICT ADMIN QUESTIONS
-    "district_admin": {
-        "dashboard": {
-            "what can i do on this dashboard": "As a District Admin, your Dashboard provides comprehensive oversight of census operations across your entire district. You can view aggregated statistics for all supervisors, monitor team performance metrics, track district-wide census completion rates, manage supervisor accounts and permissions, and access critical alerts requiring administrative attention.",
-            
-            "how do i manage supervisors": "You can add new supervisors by creating user accounts with assigned geographic areas, view performance metrics for each supervisor including approval rates and processing times, reassign households between supervisors when needed, and deactivate accounts for supervisors who have completed their assignments or left the program.",
-            
-            "what is team performance": "Team performance metrics show comparative statistics across all supervisors in your district including households processed per supervisor, approval vs rejection rates, average processing time per submission, quality scores based on AI flagging patterns, and identification of supervisors who may need additional training or support."
-        },
-        
-        "analytics": {
-            "what district analytics can i see": "You have access to comprehensive district-level analytics including total households by supervisor area, demographic distributions across age groups and occupations, income level statistics and poverty indicators, verification status breakdowns, geographic heatmaps showing census coverage, time-series trends of submission rates, and comparative analysis between sub-districts.",
-            
-            "how do i compare sub-districts": "Use the analytics dashboard's comparison view to select multiple sub-districts and view side-by-side metrics. You can compare household counts, average incomes, demographic profiles, and census completion percentages. This helps identify areas needing additional resources or outreach efforts.",
-            
-            "can i export reports": "Yes, you can export comprehensive reports in PDF or Excel formats including district summary reports with key statistics, supervisor performance reports for team management, demographic breakdowns for policy planning, and audit trail exports for compliance purposes. Reports can be scheduled for automated generation."
-        },
-        
-        "audit": {
-            "what is logged for my district": "All actions performed by supervisors in your district are logged including household data entry and modifications, approval and rejection decisions, supervisor account changes you make, bulk operations like reassignments, and system configuration changes affecting your district. This provides complete accountability and traceability.",
-            
-            "how do i investigate issues": "Use the audit log's advanced filtering to search by household ID, supervisor name, action type, or date range. You can track the complete history of any household record from creation to final verification, identify patterns of incorrect approvals, and generate reports for quality assurance reviews."
-        },
-        
-        "review": {
-            "can i override supervisor decisions": "Yes, as District Admin you have authority to review and override supervisor decisions when quality issues are identified. Navigate to the household record, review the supervisor's decision and notes, add your administrative justification, and change the status. Your override action is logged separately in the audit trail."
-        }
-    },
-    
-    # STATE ANALYST QUESTIONS
-    "state_analyst": {
-        "dashboard": {
-            "what can i do on this dashboard": "As a State Analyst, your Dashboard provides read-only access to state-wide census intelligence. You can view aggregated statistics across all districts, access trend analysis and forecasting tools, generate custom analytical reports, monitor data quality metrics across regions, and create visualizations for stakeholder presentations.",
-            
-            "what is my role": "Your role is strategic analysis and reporting. You have comprehensive read-only access to all census data across the state, allowing you to identify patterns, trends, and insights that inform government policy and resource allocation decisions. You cannot modify household data or approve submissions."
-        },
-        
-        "analytics": {
-            "what state-wide metrics can i access": "You can access comprehensive state-level analytics including total households and population estimates by district, demographic distributions across urban and rural areas, socioeconomic indicators like poverty rates and education levels, occupation and employment statistics, income distribution analyses, geographic visualizations showing census coverage, and historical trend comparisons.",
-            
-            "how do i generate custom reports": "Use the analytics dashboard's report builder to select specific metrics, choose geographic regions (state-wide, by district, or urban/rural), set time periods for trend analysis, apply demographic filters, and choose visualization types. Reports can be exported in multiple formats and scheduled for recurring generation.",
-            
-            "can i see individual household data": "No, as a State Analyst you only have access to aggregated statistical data to protect individual privacy. You can view summary statistics, averages, distributions, and trends, but cannot access personally identifiable information or individual household records. This ensures census data confidentiality.",
-            
-            "what demographic breakdowns are available": "You can analyze demographics by age groups (child, youth, adult, senior), gender distribution, education levels (illiterate to post-graduate), occupation categories (agriculture, business, service, etc.), income quintiles, household sizes, and residence types. Cross-tabulation allows multidimensional analysis."
-        },
-        
-        "audit": {
-            "what audit data can i access": "You have read-only access to aggregated audit statistics including total actions performed by district, types of actions and their frequencies, approval and rejection rates over time, data quality indicators, and system usage patterns. You cannot view individual supervisor actions or personally identifiable audit records.",
-            
-            "how do i identify data quality issues": "Use the audit analytics to identify patterns like unusually high rejection rates in specific districts, anomalies in approval patterns, geographic regions with low census participation, supervisors with suspicious activity patterns, and time periods with data entry spikes. Generate quality assurance reports for district administrators."
-        }
-    },
-    
-    # POLICY MAKER QUESTIONS
-    "policy_maker": {
-        "dashboard": {
-            "what can i do on this dashboard": "As a Policy Maker, your Dashboard provides strategic policy simulation tools and high-level census insights. You can run welfare scheme simulations on census data, analyze policy impact scenarios, view state-wide demographic trends, access economic indicators for planning, and generate policy recommendation reports.",
-            
-            "what is my role": "Your role is strategic policy development and simulation. You use census data to model welfare schemes, test eligibility criteria, estimate program costs and coverage, and make data-driven policy recommendations. You have read-only access to aggregated census data and powerful simulation tools."
-        },
-        
-        "policy_simulation": {
-            "how do policy simulations work": "Policy simulations allow you to define eligibility criteria for welfare schemes (age ranges, income thresholds, occupation types, education levels) and the system calculates which households qualify based on actual census data. You receive detailed impact analysis including number of beneficiaries, total budget required, district-wise coverage, and demographic reach.",
-            
-            "what eligibility criteria can i set": "You can define multiple criteria including income limits (below a threshold), age ranges (for youth programs or pensions), occupation filters (farmers, daily wage workers), education requirements (scholarships), household size (large family benefits), residence type (urban/rural targeting), and gender specifications (women empowerment schemes). Criteria can be combined with AND/OR logic.",
-            
-            "how is the budget calculated": "The system multiplies the per-beneficiary amount you specify by the number of qualifying households from census data. It provides breakdowns by district, projects annual vs one-time costs, shows beneficiary demographics, and estimates administrative overhead. You can adjust benefit amounts to see real-time budget impact.",
-            
-            "what does coverage rate mean": "Coverage rate shows what percentage of the total population (or target demographic) would be reached by your policy. For example, if you design a senior citizen pension for people 60+ years old and 15% of census households qualify, that's your coverage rate. Higher rates mean broader impact but higher costs.",
-            
-            "can i compare different policy scenarios": "Yes, run multiple simulations with different parameters and save each scenario. The system provides side-by-side comparison showing relative costs, beneficiary counts, demographic reach, and district-wise impacts. This helps optimize policy design for maximum social benefit within budget constraints.",
-            
-            "what example policies can i simulate": "Common simulations include Universal Basic Income for households below poverty line, Senior Citizen Pension for 60+ age group, Student Scholarships for youth in education, Farmer Subsidies for agricultural workers, Women Entrepreneurship Grants for female household heads, Child Nutrition programs for families with young children, and Housing schemes for low-income urban families."
-        },
-        
-        "analytics": {
-            "what policy-relevant analytics exist": "You can access poverty level distributions, employment and unemployment statistics, education attainment metrics, demographic dependency ratios, income inequality indicators, urban vs rural economic disparities, vulnerable population segments, and historical trend analysis for longitudinal policy impact assessment.",
-            
-            "how do i identify vulnerable populations": "Use the analytics filters to segment by low income levels (below poverty line), specific occupations prone to economic instability, low education attainment, large household sizes with single income, elderly populations without working-age support, and geographic regions with concentrated poverty. This informs targeted welfare policies."
-        }
-    },
-    
-    # GENERAL PLATFORM QUESTIONS (ALL ROLES)
-    "general": {
-        "how do i verify census data": "To verify census data, review the household submissions in your Review Queue. Check for inconsistencies like income mismatches with occupation, validate identity documents, look for duplicate addresses, and examine family compositions. The AI system flags suspicious records automatically. You can approve legitimate records or reject fraudulent ones with detailed notes. All decisions are logged in the audit trail for accountability.",
-        
-        "what is the review queue workflow": "The review workflow has five steps: First, AI flags suspicious records with specific reasons. Second, the record enters your Review Queue with priority levels. Third, you investigate by examining the household data and supporting documents. Fourth, you either approve the record if legitimate or reject it with a detailed justification. Finally, your decision is logged in the audit trail for accountability and reporting.",
-        
-        "explain data quality metrics": "Data quality metrics measure the accuracy and completeness of census data. Key metrics include verification rates (percentage of approved vs total submissions), rejection rates (flagged fraudulent records), completeness scores (percentage of filled mandatory fields), consistency checks (cross-validation of related data points), and duplicate detection rates. These metrics help identify areas needing additional training or outreach.",
-        
-        "how to handle suspicious submissions": "When handling suspicious submissions, first review the AI flag reason carefully. Check all supporting documents and cross-reference data points. If the submission appears legitimate despite the flag (like a retired professional with low income), add detailed notes explaining your reasoning and approve it. If data seems fraudulent or incorrect, reject the submission with specific reasons and request the field agent to re-verify with the household in person.",
-        
-        "what is this platform": "This is a Census Data Governance and Policy Simulation System designed for government officials to manage household census data, verify submissions through AI-powered validation, review flagged records, analyze demographic and socioeconomic trends, and simulate welfare policy impacts. The platform ensures data quality, accountability through audit trails, and provides role-based access control for security.",
-        
-        "how does ai verification work": "The AI verification system automatically analyzes all household submissions using machine learning algorithms trained on historical census data. It checks for inconsistencies like income mismatches with occupation types, validates document authenticity, detects duplicate addresses, identifies unusual family compositions, and flags suspicious patterns. Flagged records go to supervisors for manual review.",
-        
-        "what are the main features": "Key features include household data collection and management, AI-powered verification and fraud detection, role-based review queue workflows, comprehensive analytics dashboards with visualization, detailed audit logging for accountability, policy simulation and impact analysis tools, district-wise and state-wide reporting, and secure authentication with hierarchical permissions.",
-        
-        "how is data security maintained": "Data security is maintained through JWT-based authentication, role-based access control limiting data visibility, encrypted data transmission, audit logging of all access and modifications, no external database exposure (in-memory storage), session management and timeout policies, and privacy rules preventing individual household data exposure to analysts and policy makers.",
-        
-        "what happens to rejected records": "Rejected household records are flagged in the system with the supervisor's rejection reason and notes. The field agent who submitted the record is notified to re-verify information with the household. Rejected records do not count toward official census statistics or analytics. The entire rejection history is preserved in audit logs for accountability."
-    }
-}
+import gzip
+import json
+import logging
+import pickle
+import re
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# The Q&A database ships gzip-compressed next to this module and is
+# loaded on first use, so web workers that never reach the fallback skip
+# both the parse cost and the resident dict. A plain fallback_qa.json
+# dropped alongside takes precedence, so the DB can still be updated
+# in place without recompressing. Populated by _ensure_loaded().
+_QA_PATH = Path(__file__).parent / "fallback_qa.json"
+_QA_GZ_PATH = Path(__file__).parent / "fallback_qa.json.gz"
+
+FALLBACK_QA = None
+
+
+# Default no-match reply; built (and interned) once instead of per miss
+_DEFAULT_FALLBACK = sys.intern(
+    "I'm having trouble finding specific information about that. However, I can help you with:\n\n"
+    "• **Dashboard features** - What you can do on your dashboard\n"
+    "• **Review workflows** - How to review and verify census data\n"
+    "• **Analytics** - Understanding metrics and reports\n"
+    "• **Policy simulations** - Testing welfare schemes\n"
+    "• **Audit logs** - Tracking changes and accountability\n"
+    "• **Role permissions** - What actions you can perform\n\n"
+    "Try asking a specific question from the topics above!"
+)
+
+# Translation table that strips punctuation in a single C-level pass
+_PUNCT_TABLE = str.maketrans('', '', '?!.')
+
+# Terminal marker inside the question trie; never collides with real chars
+_TRIE_END = '\0'
+
+
+def _preprocess():
+    """
+    Walk FALLBACK_QA once at import and precompute everything the matcher
+    needs per question, addressed by an integer question id. Questions are
+    laid out flat in structure-of-arrays form - parallel tuples for cleaned
+    text, token frozensets, token counts and answers - with each (role,
+    page) bucket occupying a contiguous slice of ids. Tokens are mapped to dense
+    integer ids through a shared vocabulary, and an inverted index
+    token id -> [question ids] lets a lookup only score questions sharing at
+    least one token with the user message (candidate generation, then
+    scoring) instead of scanning every entry.
+    """
+    questions_clean = []
+    question_words_list = []
+    question_lens = []
+    question_masks = []
+    answers = []
+    buckets = []
+    bucket_slices = {}
+    answer_pool = {}
+    vocab = {}
+    postings = {}
+    trie = {}
+    qclean_to_qids = {}
+
+    def _add(question, answer, bucket_key):
+        qid = len(questions_clean)
+        question_clean = question.translate(_PUNCT_TABLE)
+        question_words = frozenset(question_clean.split())
+        questions_clean.append(question_clean)
+        question_words_list.append(question_words)
+        question_lens.append(len(question_words))
+        canonical_answer = answer_pool.get(answer)
+        if canonical_answer is None:
+            canonical_answer = answer_pool[answer] = sys.intern(answer)
+        else:
+            logger.debug("Duplicate answer collapsed for question: %s", question_clean)
+        answers.append(canonical_answer)
+        buckets.append(bucket_key)
+        mask = 0
+        for token in question_words:
+            token_id = vocab.setdefault(token, len(vocab))
+            postings.setdefault(token_id, []).append(qid)
+            mask |= 1 << token_id
+        question_masks.append(mask)
+        node = trie
+        for char in question_clean:
+            node = node.setdefault(char, {})
+        node.setdefault(_TRIE_END, []).append(qid)
+        qclean_to_qids.setdefault(question_clean, []).append(qid)
+
+    def _add_bucket(bucket_key, page_qa):
+        start = len(questions_clean)
+        for question, answer in page_qa.items():
+            _add(question, answer, bucket_key)
+        bucket_slices[bucket_key] = slice(start, len(questions_clean))
+
+    for role, pages in FALLBACK_QA.items():
+        if role == "general":
+            _add_bucket("general", pages)
+            continue
+        for page, page_qa in pages.items():
+            _add_bucket((role, page), page_qa)
+
+    # Longest alternatives first so the longer of two questions sharing a
+    # start wins; one scan of the message then finds any embedded question.
+    substring_re = re.compile('|'.join(
+        re.escape(question_clean)
+        for question_clean in sorted(qclean_to_qids, key=len, reverse=True)))
+
+    return (tuple(questions_clean), tuple(question_words_list),
+            tuple(question_lens), tuple(question_masks), tuple(answers),
+            tuple(buckets), bucket_slices, vocab, postings, trie,
+            qclean_to_qids, substring_re)
+
+
+def _trie_longest_prefix(message, bucket_key):
+    """
+    Walk the message through the question trie in a single O(len(message))
+    traversal and return (role_qid, general_qid): the deepest question that
+    is a prefix of the message, tracked separately for the caller's bucket
+    and the general bucket. Either may be None.
+    """
+    role_qid = None
+    general_qid = None
+    node = _TRIE
+    for char in message:
+        node = node.get(char)
+        if node is None:
+            break
+        for qid in node.get(_TRIE_END, ()):
+            bucket = _BUCKETS[qid]
+            if bucket == bucket_key:
+                role_qid = qid
+            elif bucket == "general":
+                general_qid = qid
+    return role_qid, general_qid
+
+
+_QUESTIONS_CLEAN = _QUESTION_WORDS = _QUESTION_LENS = _QUESTION_MASKS = None
+_ANSWERS = _BUCKETS = _BUCKET_SLICES = _VOCAB = _POSTINGS = _TRIE = None
+_QCLEAN_TO_QIDS = _SUBSTRING_RE = None
+
+_load_lock = threading.Lock()
+_loaded = False
+
+
+def _ensure_loaded() -> None:
+    """Load fallback_qa.json and build the indices on first use."""
+    global _loaded, FALLBACK_QA
+    global _QUESTIONS_CLEAN, _QUESTION_WORDS, _QUESTION_LENS, _QUESTION_MASKS
+    global _ANSWERS, _BUCKETS, _BUCKET_SLICES, _VOCAB, _POSTINGS, _TRIE
+    global _QCLEAN_TO_QIDS, _SUBSTRING_RE
+    if _loaded:
+        return
+    with _load_lock:
+        if _loaded:
+            return
+        if _QA_PATH.exists():
+            with open(_QA_PATH, encoding="utf-8") as f:
+                FALLBACK_QA = json.load(f)
+        else:
+            with gzip.open(_QA_GZ_PATH, "rt", encoding="utf-8") as f:
+                FALLBACK_QA = json.load(f)
+        (_QUESTIONS_CLEAN, _QUESTION_WORDS, _QUESTION_LENS, _QUESTION_MASKS,
+         _ANSWERS, _BUCKETS, _BUCKET_SLICES, _VOCAB, _POSTINGS, _TRIE,
+         _QCLEAN_TO_QIDS, _SUBSTRING_RE) = _preprocess()
+        _loaded = True
+
+
+def _bucket_ids(bucket_key):
+    """Contiguous question-id range for a bucket, or () if absent."""
+    bucket = _BUCKET_SLICES.get(bucket_key)
+    if bucket is None:
+        return ()
+    return range(bucket.start, bucket.stop)
+
+
+# Semantic cache over past live-Gemini answers: a paraphrase of an already
+# answered question is served locally instead of costing another API call.
+# Kept strictly optional - this module's job is to work when the heavy ML
+# stack (or the network) is exactly what failed.
+_SEMANTIC_THRESHOLD = 0.9
+_SEMANTIC_CACHE_MAX = 256
+_SEMANTIC_CACHE_PATH = Path.home() / ".cache" / "hackingdelhi" / "semantic_cache.pkl"
+
+_semantic_model = None   # loaded encoder, or False once deps proved absent
+_semantic_cache = None   # list of (normalized embedding, role, page, answer)
+
+
+def _get_semantic_model():
+    """Lazily load the sentence-transformer; returns None when unavailable."""
+    global _semantic_model
+    if _semantic_model is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+            _semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
+        except Exception as e:
+            logger.debug("Semantic cache disabled: %s", e)
+            _semantic_model = False
+    return _semantic_model or None
+
+
+def _get_semantic_cache() -> list:
+    """Load the persisted (embedding, answer) pairs on first use."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        try:
+            with open(_SEMANTIC_CACHE_PATH, "rb") as f:
+                _semantic_cache = pickle.load(f)
+            # Drop entries persisted before role/page scoping was added;
+            # they carry no scope and could leak across roles
+            _semantic_cache = [e for e in _semantic_cache if len(e) == 4]
+        except (OSError, pickle.UnpicklingError, EOFError):
+            _semantic_cache = []
+    return _semantic_cache
+
+
+def record_llm_answer(user_message: str, answer: str, role: str,
+                      page: str = None) -> None:
+    """
+    Remember a live-Gemini answer so future paraphrases of the same
+    question can be served from the semantic cache. Entries are scoped
+    to (role, page) - answers are generated under role-specific prompts,
+    so they must never cross permission contexts. Best-effort: a
+    missing ML stack or unwritable cache dir silently disables it.
+    """
+    model = _get_semantic_model()
+    if model is None:
+        return
+    import numpy as np
+    user_message_clean = user_message.lower().translate(_PUNCT_TABLE).strip()
+    embedding = np.asarray(
+        model.encode(user_message_clean, normalize_embeddings=True),
+        dtype=np.float32)
+    cache = _get_semantic_cache()
+    cache.append((embedding, role.lower(), (page or "all").lower(), answer))
+    del cache[:-_SEMANTIC_CACHE_MAX]  # bounded: evict oldest entries
+    try:
+        _SEMANTIC_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(_SEMANTIC_CACHE_PATH, "wb") as f:
+            pickle.dump(cache, f)
+    except OSError:
+        pass
+
+
+def _semantic_lookup(user_message_clean: str, role: str, page: str):
+    """Nearest same-scope cached answer by cosine similarity, or None."""
+    model = _get_semantic_model()
+    if model is None:
+        return None
+    # Only entries recorded under the same (role, page) scope compete;
+    # an answer written for another role must never be served here
+    role_key = role.lower()
+    page_key = (page or "all").lower()
+    candidates = [
+        (embedding, answer)
+        for embedding, entry_role, entry_page, answer in _get_semantic_cache()
+        if entry_role == role_key and entry_page == page_key
+    ]
+    if not candidates:
+        return None
+    import numpy as np
+    query = np.asarray(
+        model.encode(user_message_clean, normalize_embeddings=True),
+        dtype=np.float32)
+    # One vectorized dot over the stacked candidates; embeddings are
+    # normalized so the dot product is cosine similarity.
+    scores = np.stack([embedding for embedding, _ in candidates]) @ query
+    best = int(scores.argmax())
+    if scores[best] > _SEMANTIC_THRESHOLD:
+        logger.debug("Semantic cache hit (score: %.3f)", float(scores[best]))
+        return candidates[best][1]
+    return None
+
+
+def _resolve(user_message_clean: str, role: str, page: str) -> str:
+    """Exact/fuzzy match first; on a miss, consult the semantic cache."""
+    _ensure_loaded()
+    response = _get_fallback_response_cached(user_message_clean, role, page)
+    if response is _DEFAULT_FALLBACK:
+        semantic_answer = _semantic_lookup(user_message_clean, role, page)
+        if semantic_answer is not None:
+            return semantic_answer
+    return response
 
 
 def get_fallback_response(user_message: str, role: str, page: str) -> str:
     """
     Get fallback response when Gemini API is unavailable.
-    Uses fuzzy matching to find relevant pre-generated answers.
+    Uses fuzzy matching over precomputed question indices.
     """
-    user_message_lower = user_message.lower().strip()
-    # Remove punctuation for better matching
-    user_message_clean = user_message_lower.replace('?', '').replace('!', '').replace('.', '')
-    
-    print(f"[FALLBACK] Checking message: '{user_message_clean}'")
-    print(f"[FALLBACK] Role: {role}, Page: {page}")
-    
-    # Check role-specific questions first
-    if role in FALLBACK_QA and page in FALLBACK_QA[role]:
-        page_qa = FALLBACK_QA[role][page]
-        for question, answer in page_qa.items():
-            question_clean = question.replace('?', '').replace('!', '').replace('.', '')
-            # Check exact match or if most words match
-            if question_clean in user_message_clean or user_message_clean in question_clean:
-                print(f"[FALLBACK] Matched role-specific question: {question}")
-                return answer
-            # Check if key words match (at least 3 words)
-            question_words = set(question_clean.split())
-            message_words = set(user_message_clean.split())
-            common_words = question_words & message_words
-            if len(common_words) >= 3 and len(question_words) > 0:
-                match_ratio = len(common_words) / len(question_words)
-                if match_ratio >= 0.6:
-                    print(f"[FALLBACK] Fuzzy matched role-specific: {question} (ratio: {match_ratio})")
-                    return answer
-    
-    # Check general questions with improved matching
-    for question, answer in FALLBACK_QA["general"].items():
-        question_clean = question.replace('?', '').replace('!', '').replace('.', '')
-        # Check exact match or substring
-        if question_clean in user_message_clean or user_message_clean in question_clean:
-            print(f"[FALLBACK] Matched general question: {question}")
-            return answer
-        # Check fuzzy match with key words
-        question_words = set(question_clean.split())
-        message_words = set(user_message_clean.split())
-        common_words = question_words & message_words
-        if len(common_words) >= 3 and len(question_words) > 0:
-            match_ratio = len(common_words) / len(question_words)
-            if match_ratio >= 0.6:
-                print(f"[FALLBACK] Fuzzy matched general: {question} (ratio: {match_ratio})")
-                return answer
-    
-    print(f"[FALLBACK] No match found")
-    
+    # Lowercase and strip punctuation in one translate pass
+    user_message_clean = user_message.lower().translate(_PUNCT_TABLE).strip()
+    return _resolve(user_message_clean, role, page)
+
+
+def get_fallback_responses(items) -> list:
+    """
+    Batch variant resolving an iterable of (user_message, role, page)
+    tuples in one call. All messages share the precomputed indices and
+    the response LRU, so duplicate phrasings within a burst are matched
+    once. Callers that coalesce concurrent requests before a single
+    batched Gemini call can use this to answer the fallback-eligible
+    ones locally first.
+    """
+    return [
+        _resolve(user_message.lower().translate(_PUNCT_TABLE).strip(), role, page)
+        for user_message, role, page in items
+    ]
+
+
+@lru_cache(maxsize=2048)
+def _get_fallback_response_cached(user_message_clean: str, role: str, page: str) -> str:
+    """
+    Matching core, memoized on the normalized message. The computation is
+    pure in its arguments and repeat phrasings are common for a demo
+    chatbot, so cache hits skip the matching loops entirely.
+    """
+    logger.debug("Checking message: %r (role=%s, page=%s)", user_message_clean, role, page)
+
+    # Fast path: if a known question is a prefix of the message, the trie
+    # finds it in one pass over the message, independent of dictionary size.
+    # A general-bucket prefix hit is held back until the role-specific loop
+    # has had its chance, preserving the original match precedence.
+    trie_role_qid, trie_general_qid = _trie_longest_prefix(user_message_clean, (role, page))
+    if trie_role_qid is not None:
+        logger.debug("Matched role-specific question: %s", _QUESTIONS_CLEAN[trie_role_qid])
+        return _ANSWERS[trie_role_qid]
+
+    # One linear regex scan finds any known question embedded anywhere in
+    # the message, replacing the per-candidate substring check below. A
+    # general-bucket hit waits for the role-specific loop, like the trie's.
+    general_sub_qid = trie_general_qid
+    for match in _SUBSTRING_RE.finditer(user_message_clean):
+        role_sub_qid = None
+        for qid in _QCLEAN_TO_QIDS[match.group()]:
+            bucket = _BUCKETS[qid]
+            if bucket == (role, page):
+                role_sub_qid = qid
+            elif bucket == "general" and general_sub_qid is None:
+                general_sub_qid = qid
+        if role_sub_qid is not None:
+            logger.debug("Matched role-specific question: %s", _QUESTIONS_CLEAN[role_sub_qid])
+            return _ANSWERS[role_sub_qid]
+
+    # The message is tokenized exactly once, after the exact-match fast
+    # paths above, so trie/regex hits never pay for the split.
+    message_words = frozenset(user_message_clean.split())
+
+    # Candidate generation plus a bitmask of the message's known tokens.
+    # Each question also carries a precomputed mask over the shared
+    # vocabulary, so the common-word count per candidate is one integer
+    # AND plus a popcount instead of a set intersection. Tokens outside
+    # the vocabulary are ignored, exactly as set intersection would.
+    candidates = set()
+    message_mask = 0
+    vocab_get = _VOCAB.get
+    for token in message_words:
+        token_id = vocab_get(token)
+        if token_id is not None:
+            candidates.update(_POSTINGS[token_id])
+            message_mask |= 1 << token_id
+
+    # A fuzzy match needs at least 3 common words; with fewer than 3
+    # known tokens in the message (or in a question) the branch can never
+    # fire, so the mask work is skipped outright in those cases.
+    fuzzy_possible = message_mask.bit_count() >= 3
+
+    # Single scored pass over the candidates from both buckets: each
+    # surviving question gets (bucket priority, score) where a fragment
+    # match scores above any fuzzy ratio, and the best tuple wins. This
+    # replaces the old role-then-general double scan, so a general-bucket
+    # hit no longer pays for a full failed role pass first.
+    best_key = None
+    best_qid = None
+    for qid in candidates:
+        bucket = _BUCKETS[qid]
+        if bucket == (role, page):
+            priority = 2
+        elif bucket == "general":
+            priority = 1
+        else:
+            continue
+        question_clean = _QUESTIONS_CLEAN[qid]
+        # A message that is a fragment of the question outranks fuzzy hits
+        if user_message_clean in question_clean:
+            score = 2.0
+        else:
+            n_question_words = _QUESTION_LENS[qid]
+            if not fuzzy_possible or n_question_words < 3:
+                continue
+            common_count = (message_mask & _QUESTION_MASKS[qid]).bit_count()
+            if common_count < 3:
+                continue
+            score = common_count / n_question_words
+            if score < 0.6:
+                continue
+        key = (priority, score, -qid)  # -qid: earliest entry wins ties
+        if best_key is None or key > best_key:
+            best_key = key
+            best_qid = qid
+
+    # Role-specific winner beats everything else
+    if best_key is not None and best_key[0] == 2:
+        logger.debug("Matched role-specific: %s (score: %s)", _QUESTIONS_CLEAN[best_qid], best_key[1])
+        return _ANSWERS[best_qid]
+
+    # A general substring/prefix hit outranks general fuzzy candidates
+    if general_sub_qid is not None:
+        logger.debug("Matched general question: %s", _QUESTIONS_CLEAN[general_sub_qid])
+        return _ANSWERS[general_sub_qid]
+
+    if best_qid is not None:
+        logger.debug("Matched general: %s (score: %s)", _QUESTIONS_CLEAN[best_qid], best_key[1])
+        return _ANSWERS[best_qid]
+
+    logger.debug("No match found")
+
     # Default fallback with helpful suggestions
-    return (
-        "I'm having trouble finding specific information about that. However, I can help you with:\n\n"
-        "• **Dashboard features** - What you can do on your dashboard\n"
-        "• **Review workflows** - How to review and verify census data\n"
-        "• **Analytics** - Understanding metrics and reports\n"
-        "• **Policy simulations** - Testing welfare schemes\n"
-        "• **Audit logs** - Tracking changes and accountability\n"
-        "• **Role permissions** - What actions you can perform\n\n"
-        "Try asking a specific question from the topics above!"
-    )
+    return _DEFAULT_FALLBACK
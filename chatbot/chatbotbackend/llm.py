@@ -3,19 +3,66 @@ LLM Integration Module
 Handles Google Gemini API for generating chatbot responses
 """
 
+import asyncio
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 # Load environment variables
 load_dotenv()
 
+# Persistent response cache: repeated prompts (common when users retry or
+# several sessions ask the same question) skip the whole Gemini round-trip.
+# One small text file per entry, keyed on (model, max_tokens, prompt).
+LLM_CACHE_DIR = os.path.join(os.path.dirname(__file__), "llm_cache")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = 4096
+
+
+def _cache_key(model_name: str, prompt: str, max_tokens: int) -> str:
+    payload = f"{model_name}|{max_tokens}|{prompt}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _cache_get(key: str):
+    """Return the cached response text, or None on miss/expiry."""
+    path = os.path.join(LLM_CACHE_DIR, key)
+    try:
+        if time.time() - os.path.getmtime(path) < LLM_CACHE_TTL:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+def _cache_put(key: str, text: str) -> None:
+    """Store a response; best-effort, evicting oldest entries over the cap."""
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(LLM_CACHE_DIR, key), "w", encoding="utf-8") as f:
+            f.write(text)
+        entries = os.listdir(LLM_CACHE_DIR)
+        if len(entries) > LLM_CACHE_MAX_ENTRIES:
+            paths = [os.path.join(LLM_CACHE_DIR, name) for name in entries]
+            paths.sort(key=os.path.getmtime)
+            for stale in paths[:len(paths) - LLM_CACHE_MAX_ENTRIES]:
+                os.remove(stale)
+    except OSError:
+        pass  # an unwritable cache dir must never break generation
+
+
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables. Please set it in .env file")
 
-genai.configure(api_key=GEMINI_API_KEY)
+# gRPC keeps persistent HTTP/2 channels to the API, so sequential and
+# concurrent calls reuse one TCP+TLS handshake instead of paying ~50-80 ms
+# connection setup per request.
+genai.configure(api_key=GEMINI_API_KEY, transport="grpc")
 
 # Use gemini-2.5-flash-lite as alternative with good quota limits
 PRIMARY_MODEL = 'gemini-2.5-flash-lite'
@@ -23,6 +70,119 @@ FALLBACK_MODEL = 'gemini-3-flash-preview'
 
 print("✓ Gemini API configured successfully")
 
+# Model handles, safety settings and the default generation config are all
+# request-invariant, so build them once instead of on every call.
+_PRIMARY = genai.GenerativeModel(PRIMARY_MODEL)
+_FALLBACK = genai.GenerativeModel(FALLBACK_MODEL)
+
+_SAFETY = {
+    'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+    'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+    'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+    'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+}
+
+_DEFAULT_MAX_TOKENS = 2048
+_DEFAULT_GEN_CONFIG = genai.types.GenerationConfig(
+    max_output_tokens=_DEFAULT_MAX_TOKENS,
+    temperature=0.3,  # Lower temperature for factual, consistent responses
+    top_p=0.8,
+    top_k=40
+)
+
+# Cap concurrent in-flight Gemini calls so gather()-style fan-out from the
+# async endpoints stays inside the API rate limits.
+_GEMINI_SEMAPHORE = asyncio.Semaphore(16)
+
+# The model actually used for generation. Selected once from the cached
+# model listing instead of discovering a missing primary via a failed API
+# round-trip on every request; demoted permanently if a call still 404s.
+_active_model = None
+
+
+def _get_model():
+    """Return the generation model, preferring the primary when available."""
+    global _active_model
+    if _active_model is None:
+        _active_model = _PRIMARY
+        try:
+            from model_cache import get_available_models
+            available = get_available_models()
+            if available and not any(PRIMARY_MODEL in name for name in available):
+                print(f"⚠️ {PRIMARY_MODEL} not available for this key, using {FALLBACK_MODEL}")
+                _active_model = _FALLBACK
+        except Exception:
+            pass  # listing unavailable - assume the primary works
+    return _active_model
+
+
+def warm_model_selection() -> None:
+    """
+    Resolve the active model eagerly (called from startup warmup).
+
+    A cold _get_model() may fire the model-listing RPC via model_cache;
+    doing it once at startup means no request ever pays that round trip.
+    """
+    _get_model()
+
+
+def _demote_to_fallback():
+    """Remember that the primary model 404'd so later calls skip it."""
+    global _active_model
+    _active_model = _FALLBACK
+
+
+# Both flash models take ~1M input tokens; estimating ~4 chars/token locally
+# avoids spending a count_tokens RPC just to guard against overflow.
+_MODEL_CONTEXT_TOKENS = 1_048_576
+
+
+def _truncate_prompt(prompt: str, max_tokens: int) -> str:
+    """Trim a runaway prompt so input + response fit the context window.
+
+    Keeps the head (system instructions) and tail (user question) and cuts
+    the middle, where a runaway RAG concatenation would be. No-op for the
+    overwhelming majority of prompts.
+    """
+    budget_chars = (_MODEL_CONTEXT_TOKENS - max_tokens) * 4
+    if len(prompt) <= budget_chars:
+        return prompt
+    print(f"⚠️ Prompt too long ({len(prompt)} chars), truncating to fit context window")
+    head = budget_chars // 2
+    tail = budget_chars - head
+    return prompt[:head] + "\n...[context truncated]...\n" + prompt[-tail:]
+
+
+def _gen_config(max_tokens: int):
+    """Reuse the default config unless the caller overrides max_tokens."""
+    if max_tokens == _DEFAULT_MAX_TOKENS:
+        return _DEFAULT_GEN_CONFIG
+    return genai.types.GenerationConfig(
+        max_output_tokens=max_tokens,
+        temperature=0.3,
+        top_p=0.8,
+        top_k=40
+    )
+
+
+def _extract_text(response) -> str:
+    """Pull the generated text out of a Gemini response, or None."""
+    if response and response.candidates:
+        candidate = response.candidates[0]
+        if candidate.content and candidate.content.parts:
+            text_parts = []
+            for part in candidate.content.parts:
+                if hasattr(part, 'text') and part.text:
+                    text_parts.append(part.text)
+            if text_parts:
+                return ' '.join(text_parts).strip()
+
+    # Fallback: try direct text access
+    try:
+        return response.text.strip()
+    except:
+        return None
+
 
 def generate_answer(prompt: str, max_tokens: int = 2048) -> str:
     """
@@ -35,72 +195,176 @@ def generate_answer(prompt: str, max_tokens: int = 2048) -> str:
     Returns:
         Generated text response
     """
-    
+
+    prompt = _truncate_prompt(prompt, max_tokens)
+    cache_key = _cache_key(PRIMARY_MODEL, prompt, max_tokens)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # Configure generation parameters for concise, professional responses
-        generation_config = genai.types.GenerationConfig(
-            max_output_tokens=max_tokens,
-            temperature=0.3,  # Lower temperature for factual, consistent responses
-            top_p=0.8,
-            top_k=40
-        )
-        
-        # Try primary model first
+        generation_config = _gen_config(max_tokens)
+
+        # Use the prechecked model; only a genuine 404 demotes to fallback
+        model = _get_model()
         try:
-            model = genai.GenerativeModel(PRIMARY_MODEL)
             response = model.generate_content(
                 prompt,
                 generation_config=generation_config,
-                safety_settings={
-                    'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                    'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                    'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                    'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                }
+                safety_settings=_SAFETY
             )
         except Exception as model_error:
-            # If primary model fails, try fallback
-            if "404" in str(model_error) or "not found" in str(model_error).lower():
+            if model is _PRIMARY and ("404" in str(model_error) or "not found" in str(model_error).lower()):
                 print(f"⚠️ Primary model failed, switching to fallback: {FALLBACK_MODEL}")
-                model = genai.GenerativeModel(FALLBACK_MODEL)
-                response = model.generate_content(
+                _demote_to_fallback()
+                response = _FALLBACK.generate_content(
                     prompt,
                     generation_config=generation_config,
-                    safety_settings={
-                        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                    }
+                    safety_settings=_SAFETY
                 )
             else:
                 raise model_error
-        
+
         # Extract text from response - handle different response formats
-        if response and response.candidates:
-            # Access the first candidate's content
-            candidate = response.candidates[0]
-            if candidate.content and candidate.content.parts:
-                text_parts = []
-                for part in candidate.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        text_parts.append(part.text)
-                if text_parts:
-                    return ' '.join(text_parts).strip()
-        
-        # Fallback: try direct text access
-        try:
-            return response.text.strip()
-        except:
-            pass
-        
+        text = _extract_text(response)
+        if text:
+            _cache_put(cache_key, text)
+            return text
+
+        # Apology/error responses are intentionally not cached
         return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
-    
+
     except Exception as e:
         print(f"Error generating response: {e}")
         return "An error occurred while processing your request. Please try again."
 
 
+async def generate_answer_async(prompt: str, max_tokens: int = 2048) -> str:
+    """
+    Async variant of generate_answer for the ASGI endpoints.
+
+    Awaiting the HTTPS round-trip instead of blocking lets the event loop
+    interleave many chat requests; the semaphore keeps concurrent Gemini
+    calls bounded.
+    """
+
+    prompt = _truncate_prompt(prompt, max_tokens)
+    cache_key = _cache_key(PRIMARY_MODEL, prompt, max_tokens)
+    # Disk-cache file I/O is blocking; run it in a worker thread so the
+    # handler actually yields while it executes.
+    cached = await asyncio.to_thread(_cache_get, cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        generation_config = _gen_config(max_tokens)
+
+        # A cold first call may block on the model-listing RPC inside
+        # _get_model; resolve it in a worker thread before taking a
+        # semaphore slot so the listing never stalls the event loop
+        if _active_model is None:
+            await asyncio.to_thread(_get_model)
+
+        async with _GEMINI_SEMAPHORE:
+            model = _get_model()
+            try:
+                response = await model.generate_content_async(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=_SAFETY
+                )
+            except Exception as model_error:
+                if model is _PRIMARY and ("404" in str(model_error) or "not found" in str(model_error).lower()):
+                    print(f"⚠️ Primary model failed, switching to fallback: {FALLBACK_MODEL}")
+                    _demote_to_fallback()
+                    response = await _FALLBACK.generate_content_async(
+                        prompt,
+                        generation_config=generation_config,
+                        safety_settings=_SAFETY
+                    )
+                else:
+                    raise model_error
+
+        text = _extract_text(response)
+        if text:
+            await asyncio.to_thread(_cache_put, cache_key, text)
+            return text
+
+        return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
+
+    except Exception as e:
+        print(f"Error generating response: {e}")
+        return "An error occurred while processing your request. Please try again."
+
+
+async def generate_answer_batch(prompts: list, max_tokens: int = 2048) -> list:
+    """Generate answers for several prompts concurrently."""
+    return await asyncio.gather(
+        *[generate_answer_async(p, max_tokens) for p in prompts]
+    )
+
+
+def generate_answer_stream(prompt: str, max_tokens: int = 2048):
+    """
+    Yield response text chunks as Gemini produces them.
+
+    Streaming cuts time-to-first-token for long answers; callers that need
+    the whole string should keep using generate_answer. A cache hit is
+    yielded as a single chunk, and the joined text of a finished stream is
+    written back to the cache.
+    """
+
+    prompt = _truncate_prompt(prompt, max_tokens)
+    cache_key = _cache_key(PRIMARY_MODEL, prompt, max_tokens)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    try:
+        generation_config = _gen_config(max_tokens)
+
+        model = _get_model()
+        try:
+            response = model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=_SAFETY,
+                stream=True
+            )
+        except Exception as model_error:
+            if model is _PRIMARY and ("404" in str(model_error) or "not found" in str(model_error).lower()):
+                print(f"⚠️ Primary model failed, switching to fallback: {FALLBACK_MODEL}")
+                _demote_to_fallback()
+                response = _FALLBACK.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=_SAFETY,
+                    stream=True
+                )
+            else:
+                raise model_error
+
+        chunks = []
+        for chunk in response:
+            try:
+                text = chunk.text
+            except Exception:
+                continue  # safety-blocked or empty chunk
+            if text:
+                chunks.append(text)
+                yield text
+
+        if chunks:
+            full_text = ''.join(chunks).strip()
+            _cache_put(cache_key, full_text)
+
+    except Exception as e:
+        print(f"Error generating response: {e}")
+        yield "An error occurred while processing your request. Please try again."
+
+
 def test_connection() -> bool:
     """
     Test if Gemini API is working correctly.
@@ -111,8 +375,7 @@ def test_connection() -> bool:
     
     try:
         # Simple direct test without going through generate_answer
-        test_model = genai.GenerativeModel(PRIMARY_MODEL)
-        response = test_model.generate_content(
+        response = _PRIMARY.generate_content(
             "Say 'OK'",
             generation_config=genai.types.GenerationConfig(
                 max_output_tokens=10,
@@ -141,8 +404,7 @@ def test_connection() -> bool:
         print(f"Gemini API test failed: {e}")
         # Try fallback model
         try:
-            fallback_model = genai.GenerativeModel(FALLBACK_MODEL)
-            response = fallback_model.generate_content("Say 'OK'")
+            response = _FALLBACK.generate_content("Say 'OK'")
             return True
         except:
             return False
@@ -0,0 +1,70 @@
+"""
+Shared cache of Gemini models available to the configured API key
+
+The model list changes rarely but costs a slow list_models() round-trip.
+It is persisted once to a JSON file that every worker process reads back
+through mmap, so all workers share the same OS page-cache buffer instead
+of each re-hitting the API at startup. Writers are serialized with an
+advisory flock where the platform provides one.
+
+Callers are expected to have run genai.configure() before forcing a
+refresh; reading a fresh cache needs no API key at all.
+"""
+
+import json
+import mmap
+import os
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX platforms - locking becomes best-effort
+    fcntl = None
+
+CACHE_PATH = Path.home() / ".cache" / "hackingdelhi" / "models.json"
+DEFAULT_TTL = int(os.getenv("MODEL_CACHE_TTL", "3600"))
+
+
+def _read_cached() -> list:
+    """Read the cache file through a shared read-only mapping."""
+    with open(CACHE_PATH, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return json.loads(bytes(buf))
+
+
+def get_available_models(ttl: int = DEFAULT_TTL, refresh: bool = False) -> list:
+    """
+    Return model names supporting generateContent, using the shared disk
+    cache while it is younger than ttl seconds. Note the cache can be
+    stale if models were enabled/disabled for the key since the last
+    refresh - pass refresh=True when in doubt.
+    """
+    if not refresh:
+        try:
+            if time.time() - CACHE_PATH.stat().st_mtime < ttl:
+                return _read_cached()
+        except (OSError, ValueError):
+            pass  # missing or corrupt cache - fall through to the API
+
+    import google.generativeai as genai
+
+    models_found = []
+    for m in genai.list_models():
+        if 'generateContent' in m.supported_generation_methods:
+            models_found.append(m.name)
+
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # a+ keeps the inode other readers may have mapped; flock then
+        # truncate-and-rewrite so concurrent refreshes don't interleave
+        with open(CACHE_PATH, "a+", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            f.seek(0)
+            f.truncate()
+            json.dump(models_found, f)
+    except OSError:
+        pass  # cache is best-effort; the listing itself succeeded
+
+    return models_found
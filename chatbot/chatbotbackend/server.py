@@ -3,37 +3,108 @@ FastAPI Server for Census Chatbot
 Provides REST API endpoints for chatbot interactions
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 import uvicorn
+import asyncio
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
-from chat_logic import generate_chatbot_response, get_quick_help
+from chat_logic import generate_chatbot_response_async, get_quick_help
 from llm import test_connection
+import rag
 
 # Load environment variables
 load_dotenv()
 
 # Initialize FastAPI app
+# orjson serializes responses in C - noticeably cheaper than stdlib json
+# for the long LLM strings /chat returns.
 app = FastAPI(
     title="Census Chatbot API",
     description="AI Governance Assistant for Census Management Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Configure CORS for frontend integration
+# Long natural-language chat responses compress 3-5x; tiny payloads
+# aren't worth the CPU, hence the size floor.
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
+# Configure CORS for frontend integration. Explicit origins (comma-
+# separated in CORS_ORIGINS) let the middleware take its fast path; the
+# old "*" + allow_credentials combination is also invalid per the CORS
+# spec, and the API doesn't use cookies.
+_CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=_CORS_ORIGINS,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
 )
 
 
+# In-process exact-match response caches. Identical (message, role, page)
+# triples are common in demos and QA runs; a hit skips RAG and Gemini
+# entirely. Quick-help is deterministic, so it caches longer.
+_CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "300"))
+_HELP_CACHE_TTL = int(os.getenv("HELP_CACHE_TTL", "3600"))
+_CACHE_MAX_ENTRIES = 1024
+
+_chat_cache = {}
+_help_cache = {}
+_cache_stats = {"hits": 0, "misses": 0}
+
+# The RAG + Gemini pipeline is blocking; running it on the threadpool keeps
+# the event loop free for other requests, and the semaphore bounds how many
+# pipelines run at once.
+_LLM_SEM = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "8")))
+
+# Strong reference to the startup-spawned cache sweeper task (the event
+# loop only holds weak references to tasks)
+_sweeper_task = None
+
+# Single-flight map: concurrent requests for the same cache key await one
+# in-flight pipeline run instead of each firing their own Gemini call.
+_inflight = {}
+
+
+def _cache_lookup(cache: dict, key):
+    entry = cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        _cache_stats["hits"] += 1
+        return entry[1]
+    if entry:
+        del cache[key]
+    _cache_stats["misses"] += 1
+    return None
+
+
+def _cache_store(cache: dict, key, payload, ttl: int) -> None:
+    if len(cache) >= _CACHE_MAX_ENTRIES:
+        # dicts iterate in insertion order, so this sheds the oldest quarter
+        for stale in list(cache)[:_CACHE_MAX_ENTRIES // 4]:
+            del cache[stale]
+    cache[key] = (time.monotonic() + ttl, payload)
+
+
+def _chat_cache_key(message: str, role: str, page: Optional[str]) -> str:
+    raw = f"{role.lower()}|{page or ''}|{message.strip().lower()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Roles the platform recognizes; built once instead of per request
+VALID_ROLES = frozenset({"supervisor", "district_admin", "state_analyst", "policy_maker"})
+_VALID_ROLES_DETAIL = f"Invalid role. Must be one of: {', '.join(sorted(VALID_ROLES))}"
+
+
 # Request/Response Models
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
@@ -75,7 +146,7 @@ class HealthResponse(BaseModel):
 
 
 # API Endpoints
-@app.get("/", response_model=dict)
+@app.get("/")
 async def root():
     """Root endpoint with API information"""
     return {
@@ -89,25 +160,42 @@ async def root():
     }
 
 
-@app.get("/health", response_model=HealthResponse)
+# Probes hit /health at high frequency; recomputing means a Gemini round
+# trip and a Chroma count per probe. Cache the result briefly and coalesce
+# concurrent probes behind a lock so only one recomputes.
+_HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+_health_cache = {"t": 0.0, "val": None}
+_health_lock = asyncio.Lock()
+
+
+@app.get("/health")
 async def health_check():
     """Health check endpoint to verify system status"""
-    from rag import collection
-    
-    # Test LLM connection
-    llm_status = test_connection()
-    
-    # Get knowledge base document count
-    doc_count = collection.count()
-    
-    return {
-        "status": "healthy" if llm_status and doc_count > 0 else "degraded",
-        "llm_connected": llm_status,
-        "knowledge_base_docs": doc_count
-    }
+    if time.monotonic() - _health_cache["t"] < _HEALTH_CACHE_TTL:
+        return _health_cache["val"]
+
+    async with _health_lock:
+        # another probe may have refreshed while we waited
+        if time.monotonic() - _health_cache["t"] < _HEALTH_CACHE_TTL:
+            return _health_cache["val"]
+
+        # Test LLM connection
+        llm_status = await asyncio.to_thread(test_connection)
+
+        # Get knowledge base document count
+        doc_count = rag.collection.count()
+
+        _health_cache["val"] = {
+            "status": "healthy" if llm_status and doc_count > 0 else "degraded",
+            "llm_connected": llm_status,
+            "knowledge_base_docs": doc_count
+        }
+        _health_cache["t"] = time.monotonic()
 
+    return _health_cache["val"]
 
-@app.post("/chat", response_model=ChatResponse)
+
+@app.post("/chat")
 async def chat(request: ChatRequest):
     """
     Main chat endpoint for user interactions.
@@ -119,34 +207,83 @@ async def chat(request: ChatRequest):
         ChatResponse with generated answer and metadata
     """
     
-    # Validate role
-    valid_roles = ["supervisor", "district_admin", "state_analyst", "policy_maker"]
-    if request.role.lower() not in valid_roles:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
-        )
-    
-    # Generate response
-    result = generate_chatbot_response(
-        user_message=request.message,
-        user_role=request.role,
-        page=request.page
-    )
+    # Validate and normalize the role once
+    role = request.role.lower()
+    if role not in VALID_ROLES:
+        raise HTTPException(status_code=400, detail=_VALID_ROLES_DETAIL)
     
-    # Check for errors
+    # Serve identical questions straight from the cache
+    cache_key = _chat_cache_key(request.message, request.role, request.page)
+    result = _cache_lookup(_chat_cache, cache_key)
+
+    if result is None:
+        # Paraphrases of earlier questions hit the semantic cache. The
+        # lookup is a MiniLM encode plus an HNSW query - CPU-bound work
+        # that belongs in a worker thread, not on the event loop.
+        try:
+            result = await asyncio.to_thread(
+                rag.chat_cache_lookup, request.message, role, request.page
+            )
+        except Exception:
+            result = None
+
+    if result is None:
+        inflight = _inflight.get(cache_key)
+        if inflight is not None:
+            # someone is already computing this exact question - wait for it
+            result = await inflight
+        else:
+            future = asyncio.get_running_loop().create_future()
+            _inflight[cache_key] = future
+            try:
+                # Retrieval runs in a worker thread inside the async
+                # pipeline; the Gemini call itself is awaited, so no
+                # thread is parked on the network round trip
+                async with _LLM_SEM:
+                    result = await generate_chatbot_response_async(
+                        user_message=request.message,
+                        user_role=request.role,
+                        page=request.page
+                    )
+
+                if not result.get("error"):
+                    _cache_store(_chat_cache, cache_key, result, _CHAT_CACHE_TTL)
+                    try:
+                        # Storing also embeds the message - keep it off
+                        # the event loop like the lookup above
+                        await asyncio.to_thread(
+                            rag.chat_cache_store,
+                            request.message,
+                            role,
+                            request.page,
+                            result["response"],
+                            result["sources_used"]
+                        )
+                    except Exception:
+                        pass  # semantic cache is best-effort
+
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                _inflight.pop(cache_key, None)
+
+    # Check for errors (also surfaces them to coalesced waiters)
     if result.get("error") and result["error"] == "invalid_role":
         raise HTTPException(status_code=400, detail="Invalid user role")
-    
-    return ChatResponse(
-        response=result["response"],
-        sources_used=result["sources_used"],
-        error=result.get("error")
-    )
+
+    # Already-validated data; returning a plain dict skips a second
+    # Pydantic construction/serialization pass (shape: ChatResponse)
+    return {
+        "response": result["response"],
+        "sources_used": result["sources_used"],
+        "error": result.get("error")
+    }
 
 
 @app.get("/quick-help")
-async def quick_help(role: str, page: Optional[str] = None):
+async def quick_help(request: Request, role: str, page: Optional[str] = None):
     """
     Get quick contextual help based on role and page.
     
@@ -158,19 +295,40 @@ async def quick_help(role: str, page: Optional[str] = None):
         Quick help message
     """
     
-    valid_roles = ["supervisor", "district_admin", "state_analyst", "policy_maker"]
-    if role.lower() not in valid_roles:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
-        )
-    
-    help_message = get_quick_help(role, page)
+    role_key = role.lower()
+    if role_key not in VALID_ROLES:
+        raise HTTPException(status_code=400, detail=_VALID_ROLES_DETAIL)
     
+    cache_key = (role_key, page)
+    cached = _cache_lookup(_help_cache, cache_key)
+    if cached is None:
+        payload = {
+            "help": get_quick_help(role, page),
+            "role": role,
+            "page": page
+        }
+        # Help copy is deterministic per (role, page); an ETag lets
+        # browsers and CDNs revalidate with a 304 instead of a re-fetch
+        etag = '"' + hashlib.sha256(payload["help"].encode("utf-8")).hexdigest()[:32] + '"'
+        cached = (payload, etag)
+        _cache_store(_help_cache, cache_key, cached, _HELP_CACHE_TTL)
+
+    payload, etag = cached
+    if request.headers.get("if-none-match") == etag:
+        # RFC 7232: a 304 must carry the validator it matched
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return ORJSONResponse(payload, headers={"ETag": etag})
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the exact-match response caches"""
     return {
-        "help": help_message,
-        "role": role,
-        "page": page
+        "hits": _cache_stats["hits"],
+        "misses": _cache_stats["misses"],
+        "chat_entries": len(_chat_cache),
+        "help_entries": len(_help_cache)
     }
 
 
@@ -182,9 +340,33 @@ async def startup_event():
     print("🤖 Census Chatbot Server Starting...")
     print("="*60)
     
-    # Test connections
-    from rag import collection
-    print(f"✓ Knowledge base loaded: {collection.count()} documents")
+    # Build the knowledge index (rag no longer does this at import time)
+    rag.initialize()
+    print(f"✓ Knowledge base loaded: {rag.collection.count()} documents")
+
+    # Pre-warm the pieces of the /chat path that rag.initialize() doesn't
+    # cover - the retrieval helper's query-embedding cache and the fallback
+    # QA matcher's preprocessed index - so the first user request doesn't
+    # pay for them.
+    try:
+        t0 = time.perf_counter()
+        rag.retrieve_texts("warmup", n_results=1)
+        from fallback_qa import get_fallback_response
+        get_fallback_response("warmup", "supervisor", None)
+        print(f"✓ Warmed retrieval and fallback paths in {time.perf_counter() - t0:.2f}s")
+    except Exception as e:
+        print(f"⚠️ Warmup skipped: {str(e)[:50]}")
+
+    # Hourly sweep keeps the semantic chat cache from serving stale answers
+    async def _semantic_cache_sweeper():
+        while True:
+            await asyncio.sleep(3600)
+            await asyncio.to_thread(rag.chat_cache_sweep)
+
+    # The loop keeps only a weak reference to tasks; without a strong one
+    # the sweeper could be garbage-collected mid-sleep
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(_semantic_cache_sweeper())
     
     # Simple LLM test - don't fail on startup
     try:
@@ -208,10 +390,31 @@ if __name__ == "__main__":
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8001))
     
-    uvicorn.run(
-        "server:app",
-        host=HOST,
-        port=PORT,
-        reload=True,  # Auto-reload on code changes
-        log_level="info"
-    )
+    # "auto" picks uvloop + httptools (C event loop and HTTP parser) when
+    # they're installed and falls back to the pure-Python implementations
+    # where they aren't - uvloop has no Windows build, so pinning it would
+    # break `python server.py` on Windows dev machines. Reload is opt-in
+    # since the reloader's supervisor process defeats those optimizations.
+    if os.getenv("ENV") == "prod":
+        # One process per core (roughly) sidesteps the GIL for the CPU-bound
+        # embedding work; the RAG/LLM singletons are lazy, so each worker
+        # builds its own after fork instead of sharing pre-fork state.
+        uvicorn.run(
+            "server:app",
+            host=HOST,
+            port=PORT,
+            workers=2 * (os.cpu_count() or 1) + 1,
+            loop="auto",
+            http="auto",
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "server:app",
+            host=HOST,
+            port=PORT,
+            reload=os.getenv("RELOAD", "").lower() in ("1", "true"),
+            loop="auto",
+            http="auto",
+            log_level="info"
+        )
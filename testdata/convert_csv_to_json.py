@@ -1,38 +1,141 @@
-import csv
-import json
-
-def csv_to_json(csv_file, json_file):
-    """
-    Convert CSV file to JSON format
-    
-    Args:
-        csv_file: Path to input CSV file
-        json_file: Path to output JSON file
-    """
-    data = []
-    
-    # Read CSV file
-    print(f"Reading CSV file: {csv_file}")
-    with open(csv_file, 'r', encoding='utf-8') as csvf:
-        csv_reader = csv.DictReader(csvf)
-        
-        # Convert each row to dictionary and add to data list
-        for i, row in enumerate(csv_reader, 1):
-            data.append(row)
-            if i % 10000 == 0:
-                print(f"Processed {i} rows...")
-    
-    print(f"Total rows processed: {len(data)}")
-    
-    # Write to JSON file
-    print(f"Writing to JSON file: {json_file}")
-    with open(json_file, 'w', encoding='utf-8') as jsonf:
-        json.dump(data, jsonf, indent=2, ensure_ascii=False)
-    
-    print("Conversion completed successfully!")
-
-if __name__ == "__main__":
-    csv_file = "4_7.csv"
-    json_file = "4_7.json"
-    
-    csv_to_json(csv_file, json_file)
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is the fallback
+    orjson = None
+
+# Pipeline tuning: rows are serialized in batches by a small thread pool
+# while the main thread keeps reading; the bounded window of in-flight
+# batches provides backpressure so memory stays constant.
+BATCH_ROWS = 10000
+MAX_PENDING_BATCHES = 8
+
+
+def _dump_row(row, pretty=False):
+    """Serialize one row to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        if pretty:
+            return orjson.dumps(row, option=orjson.OPT_INDENT_2)
+        return orjson.dumps(row)
+    if pretty:
+        return json.dumps(row, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(row, ensure_ascii=False).encode('utf-8')
+
+
+def _serialize_batch(batch, sep, pretty=False):
+    """Serialize a batch of rows into one sep-joined bytes blob."""
+    return sep.join(_dump_row(row, pretty) for row in batch)
+
+
+def _batches(reader, size=BATCH_ROWS):
+    """Yield lists of up to `size` rows from a csv reader."""
+    batch = []
+    for row in reader:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _convert(csv_file, out_file, sep, head, tail, pretty=False):
+    """
+    Producer/consumer conversion pipeline.
+
+    The main thread reads and batches CSV rows, a thread pool serializes
+    batches concurrently, and completed blobs are written in order. The
+    pending-futures window is capped so a fast reader can't outrun the
+    writer and balloon memory.
+    """
+    count = 0
+
+    print(f"Reading CSV file: {csv_file}")
+    with open(csv_file, 'r', encoding='utf-8', newline='') as csvf, \
+         open(out_file, 'wb', buffering=1 << 20) as outf, \
+         ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as pool:
+        outf.write(head)
+        pending = deque()
+        first = True
+
+        def drain_one():
+            nonlocal first
+            blob = pending.popleft().result()
+            if not first:
+                outf.write(sep)
+            outf.write(blob)
+            first = False
+
+        for batch in _batches(csv.DictReader(csvf)):
+            pending.append(pool.submit(_serialize_batch, batch, sep, pretty))
+            count += len(batch)
+            if len(pending) >= MAX_PENDING_BATCHES:
+                drain_one()
+            if count % 100000 == 0:
+                print(f"Processed {count} rows...")
+
+        while pending:
+            drain_one()
+        outf.write(tail)
+
+    print(f"Total rows processed: {count}")
+    print("Conversion completed successfully!")
+
+
+def csv_to_json(csv_file, json_file, pretty=False):
+    """
+    Convert CSV file to a JSON array, streaming in batches
+
+    Memory stays constant no matter how large the census extract is - the
+    old version held every row in a Python list before one json.dump pass.
+
+    Output is compact by default; pretty-printing roughly doubles the
+    file size and encode time, so it's opt-in for human inspection only.
+
+    Args:
+        csv_file: Path to input CSV file
+        json_file: Path to output JSON file
+        pretty: Indent each row's object (for eyeballing, not pipelines)
+    """
+    _convert(csv_file, json_file, sep=b",", head=b"[", tail=b"]", pretty=pretty)
+
+
+def csv_to_ndjson(csv_file, ndjson_file):
+    """
+    Convert CSV file to newline-delimited JSON (one object per line)
+
+    NDJSON lets downstream consumers stream the file line by line instead
+    of parsing one huge array, and skips the array framing bytes.
+
+    Args:
+        csv_file: Path to input CSV file
+        ndjson_file: Path to output NDJSON file
+    """
+    _convert(csv_file, ndjson_file, sep=b"\n", head=b"", tail=b"\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert census CSV extracts to JSON")
+    parser.add_argument("csv_file", nargs="?", default="4_7.csv")
+    parser.add_argument("output_file", nargs="?", default=None)
+    parser.add_argument("--format", choices=("json", "ndjson"), default="json",
+                        help="json writes one array; ndjson writes one object per line")
+    parser.add_argument("--pretty", action="store_true",
+                        help="indent output (json format only; larger and slower)")
+    args = parser.parse_args()
+
+    if args.pretty and args.format == "ndjson":
+        parser.error("--pretty breaks the one-object-per-line NDJSON contract")
+
+    stem = args.csv_file.rsplit(".", 1)[0]
+    if args.format == "ndjson":
+        csv_to_ndjson(args.csv_file, args.output_file or f"{stem}.ndjson")
+    else:
+        csv_to_json(args.csv_file, args.output_file or f"{stem}.json", pretty=args.pretty)